@@ -1,32 +1,221 @@
 import asyncio
 import logging
-import os
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from bson import ObjectId
+from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
-from typing import List, Dict, Any, Optional
+from pymongo import IndexModel, ReadPreference, UpdateOne, WriteConcern
+from pymongo.errors import (
+    BulkWriteError, ConfigurationError, ConnectionFailure, DuplicateKeyError,
+    OperationFailure, PyMongoError, ServerSelectionTimeoutError, WriteConcernError
+)
+from typing import AsyncIterator, List, Dict, Any, Optional
 from datetime import datetime
-import json
 
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Server error code when a change stream's resume token has aged out of the oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+# Server error code for a command on a collection that does not exist
+NAMESPACE_NOT_FOUND = 26
+
+@lru_cache(maxsize=2)
+def _iso_second(sec: int) -> str:
+    return datetime.utcfromtimestamp(sec).isoformat()
+
+def utc_now_iso() -> str:
+    """Current UTC time as an ISO string, at one-second resolution
+    
+    Meant for message and response timestamps; the formatted string is
+    cached per second so hot paths do not re-format it on every call.
+    """
+    return _iso_second(int(time.time()))
+
+# Matches datetime.isoformat() for the millisecond precision BSON dates carry
+_ISO_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%L000'
+
+def _iso_date(field: str) -> Dict[str, Any]:
+    """Aggregation expression rendering a date field as an ISO string, leaving other types alone"""
+    return {
+        '$cond': [
+            {'$eq': [{'$type': f'${field}'}, 'date']},
+            {'$dateToString': {'date': f'${field}', 'format': _ISO_DATE_FORMAT}},
+            f'${field}'
+        ]
+    }
+
+class _ObjectIdAsString(TypeDecoder):
+    """Decode ObjectId values straight to their hex string while the BSON is read"""
+    bson_type = ObjectId
+    
+    def transform_bson(self, value):
+        return str(value)
+
+# Reads from the data collections come back with JSON-ready ids; writes are unaffected
+STRING_ID_CODEC_OPTIONS = CodecOptions(type_registry=TypeRegistry([_ObjectIdAsString()]))
+
+def new_alert_id() -> str:
+    """Short random alert_id in the server's 'alert_xxxxxxxx' format"""
+    return f"alert_{uuid.uuid4().hex[:8]}"
+
+def new_task_id() -> str:
+    """Short random task_id in the server's 'task_xxxxxxxx' format"""
+    return f"task_{uuid.uuid4().hex[:8]}"
+
+def _write_concern_error(error: BulkWriteError) -> Optional[WriteConcernError]:
+    """The write concern failure reported by a bulk write, if any
+    
+    Such a batch was applied but not acknowledged as requested, so it must not
+    be reported to callers as a success.
+    """
+    errors = error.details.get('writeConcernErrors') or []
+    if not errors:
+        return None
+    first = errors[0]
+    return WriteConcernError(first.get('errmsg'), first.get('code'), first)
+
+def _serialized_stages(*date_fields: str) -> List[Dict[str, Any]]:
+    """Pipeline stages that turn _id into a string id and dates into ISO strings"""
+    added = {'id': {'$toString': '$_id'}}
+    for field in date_fields:
+        added[field] = _iso_date(field)
+    return [{'$addFields': added}, {'$project': {'_id': 0}}]
+
+def _alert_stages() -> List[Dict[str, Any]]:
+    """Serialization stages for alerts, filling in timestamp from created_at"""
+    fallback = {'$addFields': {'timestamp': {'$ifNull': ['$timestamp', _iso_date('created_at')]}}}
+    return [fallback, *_serialized_stages('created_at', 'updated_at')]
+
+def _requires_conn(method):
+    """Raise ConnectionFailure instead of running a database method while disconnected"""
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if not self.is_connected:
+            raise ConnectionFailure("Database not connected")
+        return await method(self, *args, **kwargs)
+    return wrapper
+
+class _TTLCache:
+    """Small LRU cache whose entries also expire after ttl seconds"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def pop(self, key):
+        self._entries.pop(key, None)
+
 class DatabaseManager:
+    # Summary view of an alert: every field except the (potentially large) image
+    # payload. List and snapshot reads use it; the detail view returns everything.
+    ALERT_SUMMARY_PROJECTION = {'image': 0}
+    # Fields every application response writes, whatever the actions are
+    RESPONDED_FIELDS = {'response': 1, 'status': 'responded'}
+    # Values filled in for fields an incoming alert leaves out
+    ALERT_DEFAULTS = {'response': 0, 'image_received': 0, 'status': 'pending'}
+    # Server-side rules every stored document must satisfy
+    ALERT_VALIDATOR = {
+        '$jsonSchema': {
+            'bsonType': 'object',
+            'required': ['alert_id', 'created_at', 'status'],
+            'properties': {
+                'alert_id': {'bsonType': 'string'},
+                'created_at': {'bsonType': 'date'},
+                'status': {'bsonType': 'string'}
+            }
+        }
+    }
+    PROCESSING_TASK_VALIDATOR = {
+        '$jsonSchema': {
+            'bsonType': 'object',
+            'required': ['task_id', 'created_at', 'status'],
+            'properties': {
+                'task_id': {'bsonType': 'string'},
+                'status': {'bsonType': 'string'}
+            }
+        }
+    }
+    # Index keys created by fix_database_schema, named after the queries they serve
+    CREATED_AT_INDEX = [('created_at', 1)]
+    IMAGES_BY_DRONE_INDEX = [('drone_id', 1), ('created_at', -1)]
+    RESULTS_BY_DRONE_INDEX = [('drone_id', 1), ('timestamp', -1)]
+    RESPONDED_INDEX = [('rl_responsed', 1), ('created_at', -1)]
+    # Equality (drone_id, status) first, then the sort keys in sort order
+    PENDING_TASKS_INDEX = [('drone_id', 1), ('status', 1), ('priority', -1), ('created_at', 1)]
+    # Alert image fields without the base64 image blobs
+    ALERT_IMAGE_SUMMARY_PROJECTION = {'actual_image': 0, 'matched_frame': 0}
+    # Alert changes relayed to subscribers; built once and reused on every reconnect
+    CHANGE_STREAM_PIPELINE = [
+        {'$match': {'operationType': {'$in': ['insert', 'update', 'replace']}}},
+        # Base64 image payloads are never needed by subscribers
+        {'$project': {'fullDocument.image': 0, 'updateDescription.updatedFields.image': 0}}
+    ]
+    
     def __init__(self):
         self.client: Optional[AsyncIOMotorClient] = None
         self.db = None
         self.alerts_collection = None
+        self.alert_inserts_collection = None
+        self.alert_reads_collection = None
         self.alert_images_collection = None
         self.processing_tasks_collection = None
         self.processing_results_collection = None
+        self.change_stream_state_collection = None
         self.is_connected = False
         self.change_stream = None
+        self._resume_token = None
+        self._delivered_token = None  # token of the last event handed to the callback
+        self._saved_token = None  # token last checkpointed to change_stream_state_collection
+        self._alert_cache = _TTLCache(Config.ALERT_CACHE_SIZE, Config.ALERT_CACHE_TTL)
+        self._stats_cache: Optional[Dict[str, Any]] = None
+        self._stats_expires_at = 0.0
+        self._stats_lock = asyncio.Lock()
+        self._stopping = False
+        self._pending_inserts: List[tuple] = []  # (document, future) awaiting the next flush
+        self._flush_task: Optional[asyncio.Task] = None
+        self._pending_updates: List[tuple] = []  # (ObjectId, update, future) awaiting the next flush
+        self._update_flush_task: Optional[asyncio.Task] = None
+        self._write_tasks: set = set()  # batched writes scheduled or in flight
         
     async def connect(self):
-        """Connect to MongoDB with proper SSL configuration"""
+        """Connect to MongoDB with proper SSL configuration
+        
+        The client is shared: calling connect() again while connected reuses it
+        rather than opening a second pool.
+        """
+        if self.is_connected and self.client is not None:
+            logger.info("Already connected to MongoDB, reusing existing client")
+            return
+        
         try:
+            if not Config.MONGODB_URI:
+                raise ConfigurationError("MONGODB_URI environment variable is not set")
+            
             logger.info("Connecting to MongoDB...")
-            logger.info(f"Connection string: {Config.MONGODB_URI[:50]}...")
+            logger.info("Connection string: %s...", Config.MONGODB_URI[:50])
             
             # Add SSL parameters to connection string
             connection_string = Config.MONGODB_URI
@@ -38,7 +227,7 @@ class DatabaseManager:
                 else:
                     connection_string += "?ssl=true&ssl_cert_reqs=CERT_NONE"
             
-            logger.info(f"Final connection string: {connection_string[:50]}...")
+            logger.info("Final connection string: %s...", connection_string[:50])
             
             # Create client with proper SSL configuration
             self.client = AsyncIOMotorClient(
@@ -46,8 +235,16 @@ class DatabaseManager:
                 serverSelectionTimeoutMS=30000,  # Increased timeout
                 connectTimeoutMS=30000,          # Increased timeout
                 socketTimeoutMS=30000,           # Increased timeout
-                maxPoolSize=10,
+                maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+                minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+                maxConnecting=Config.MONGO_MAX_CONNECTING,
+                waitQueueTimeoutMS=Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                heartbeatFrequencyMS=Config.MONGO_HEARTBEAT_FREQUENCY_MS,
                 retryWrites=True,
+                retryReads=True,
+                compressors="zstd,zlib",         # zstd needs the zstandard package
+                zlibCompressionLevel=6,
                 w="majority"
             )
             
@@ -58,40 +255,66 @@ class DatabaseManager:
             
             # Set up database and collections
             self.db = self.client[Config.DATABASE_NAME]
-            self.alerts_collection = self.db[Config.ALERTS_COLLECTION]
-            self.alert_images_collection = self.db[Config.ALERT_IMAGES_COLLECTION]
-            self.processing_tasks_collection = self.db[Config.PROCESSING_TASKS_COLLECTION]
-            self.processing_results_collection = self.db[Config.PROCESSING_RESULTS_COLLECTION]
+            self.alerts_collection = self.db.get_collection(Config.ALERTS_COLLECTION, codec_options=STRING_ID_CODEC_OPTIONS)
+            # Inserts are re-broadcast through the change stream, so they may use a
+            # lighter write concern than the client-wide one updates keep
+            insert_w = Config.ALERT_INSERT_W
+            self.alert_inserts_collection = self.alerts_collection.with_options(
+                write_concern=WriteConcern(
+                    w=int(insert_w) if insert_w.isdigit() else insert_w,
+                    j=Config.ALERT_INSERT_J
+                )
+            )
+            # Listings and stats tolerate slightly stale data, so a secondary may serve them
+            self.alert_reads_collection = self.alerts_collection.with_options(
+                read_preference=ReadPreference.SECONDARY_PREFERRED
+            )
+            self.alert_images_collection = self.db.get_collection(Config.ALERT_IMAGES_COLLECTION, codec_options=STRING_ID_CODEC_OPTIONS)
+            self.processing_tasks_collection = self.db.get_collection(Config.PROCESSING_TASKS_COLLECTION, codec_options=STRING_ID_CODEC_OPTIONS)
+            self.processing_results_collection = self.db.get_collection(Config.PROCESSING_RESULTS_COLLECTION, codec_options=STRING_ID_CODEC_OPTIONS)
+            self.change_stream_state_collection = self.db[Config.CHANGE_STREAM_STATE_COLLECTION]
             
             # Test database access
-            logger.info(f"Testing database access: {Config.DATABASE_NAME}")
-            await self.alerts_collection.count_documents({})
-            await self.alert_images_collection.count_documents({})
-            await self.processing_tasks_collection.count_documents({})
-            await self.processing_results_collection.count_documents({})
+            logger.info("Testing database access: %s", Config.DATABASE_NAME)
+            existing = set(await self.db.list_collection_names())
+            expected = {
+                Config.ALERTS_COLLECTION,
+                Config.ALERT_IMAGES_COLLECTION,
+                Config.PROCESSING_TASKS_COLLECTION,
+                Config.PROCESSING_RESULTS_COLLECTION
+            }
+            missing = expected - existing
+            if missing:
+                logger.warning("Collections not found, they will be created on first write: %s", ", ".join(sorted(missing)))
             logger.info("Database access successful")
             
             self.is_connected = True
             logger.info("Successfully connected to MongoDB")
             
         except ConnectionFailure as e:
-            logger.error(f"MongoDB connection failure: {e}")
+            logger.error("MongoDB connection failure: %s", e)
             self.is_connected = False
             raise
         except ServerSelectionTimeoutError as e:
-            logger.error(f"MongoDB server selection timeout: {e}")
+            logger.error("MongoDB server selection timeout: %s", e)
             self.is_connected = False
             raise
         except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
+            logger.error("Failed to connect to MongoDB: %s", e)
+            logger.error("Error type: %s", type(e).__name__)
             self.is_connected = False
             raise
     
     async def disconnect(self):
         """Disconnect from MongoDB"""
         try:
+            # Let alerts waiting for a batched insert or update reach the database,
+            # including batches whose write is already in flight
+            while self._write_tasks:
+                await asyncio.gather(*self._write_tasks, return_exceptions=True)
+            
             # Close change stream gracefully
+            self._stopping = True
             if self.change_stream:
                 try:
                     await self.change_stream.close()
@@ -100,7 +323,11 @@ class DatabaseManager:
                     if "operation was interrupted" in str(e) or "CursorKilled" in str(e):
                         logger.info("Change stream already closed during shutdown - this is normal")
                     else:
-                        logger.error(f"Error closing change stream: {e}")
+                        logger.error("Error closing change stream: %s", e)
+            
+            # Record how far subscribers got so the next run resumes right after it
+            if self._delivered_token is not None and self._delivered_token != self._saved_token:
+                await self._save_resume_token(self._delivered_token)
             
             # Close MongoDB client
             if self.client:
@@ -108,186 +335,361 @@ class DatabaseManager:
                     self.client.close()
                     logger.info("MongoDB client closed successfully")
                 except Exception as e:
-                    logger.error(f"Error closing MongoDB client: {e}")
+                    logger.error("Error closing MongoDB client: %s", e)
                 
             self.is_connected = False
             logger.info("Database disconnected successfully")
             
         except Exception as e:
-            logger.error(f"Error during database disconnect: {e}")
+            logger.error("Error during database disconnect: %s", e)
             self.is_connected = False
     
+    @_requires_conn
     async def create_alert(self, alert_data: Dict[str, Any]) -> str:
         """Create a new alert"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
             # Generate a unique alert_id if not provided
-            if 'alert_id' not in alert_data or not alert_data['alert_id']:
-                import uuid
-                alert_data['alert_id'] = f"alert_{uuid.uuid4().hex[:8]}"
+            if not alert_data.get('alert_id'):
+                alert_data['alert_id'] = new_alert_id()
             
-            # Add timestamp if not present
-            if 'timestamp' not in alert_data:
-                alert_data['timestamp'] = datetime.utcnow().isoformat()
+            # created_at is the stored creation time; a missing timestamp is
+            # derived from it on read instead of being written twice
+            now = datetime.utcnow()
+            alert_data['created_at'] = now
             
-            # Add created_at field
-            alert_data['created_at'] = datetime.utcnow()
-            
-            # Set default values if not present
-            if 'response' not in alert_data:
-                alert_data['response'] = 0
-            if 'image_received' not in alert_data:
-                alert_data['image_received'] = 0
-            if 'status' not in alert_data:
-                alert_data['status'] = 'pending'
-            
-            result = await self.alerts_collection.insert_one(alert_data)
-            logger.info(f"Created alert with ID: {result.inserted_id}")
-            return str(result.inserted_id)
+            # Set default values if not present; the collection validator
+            # rejects anything that still lacks a required field
+            for field, default in self.ALERT_DEFAULTS.items():
+                alert_data.setdefault(field, default)
+            
+            inserted_id = await self._queue_insert(alert_data)
+            alert_data.setdefault('timestamp', now.isoformat())
+            logger.info("Created alert with ID: %s", inserted_id)
+            return str(inserted_id)
             
         except Exception as e:
-            logger.error(f"Error creating alert: {e}")
+            logger.error("Error creating alert: %s", e)
             raise
     
+    async def _queue_insert(self, alert_data: Dict[str, Any]):
+        """Queue an alert for the next batched insert and wait for its _id"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending_inserts.append((alert_data, future))
+        if self._flush_task is None:
+            self._flush_task = self._start_write(self._flush_inserts())
+        return await future
+    
+    def _start_write(self, coro) -> asyncio.Task:
+        """Run a batched write as a task that disconnect() waits for"""
+        task = asyncio.create_task(coro)
+        self._write_tasks.add(task)
+        task.add_done_callback(self._write_tasks.discard)
+        return task
+    
+    async def _flush_inserts(self):
+        """Write all queued alerts with a single insert_many"""
+        await asyncio.sleep(Config.INSERT_BATCH_WINDOW_MS / 1000)
+        pending, self._pending_inserts = self._pending_inserts, []
+        # Alerts queued from here on start the next batch; this task stays in
+        # _write_tasks until the write below has finished
+        self._flush_task = None
+        
+        failures = {}
+        try:
+            # insert_many sets '_id' on each document in place
+            await self.alert_inserts_collection.insert_many([doc for doc, _ in pending], ordered=False)
+        except BulkWriteError as e:
+            concern_error = _write_concern_error(e)
+            if concern_error is not None:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(concern_error)
+                return
+            for error in e.details.get('writeErrors', []):
+                error_class = DuplicateKeyError if error.get('code') == 11000 else OperationFailure
+                failures[error['index']] = error_class(error.get('errmsg'), error.get('code'), error)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for index, (doc, future) in enumerate(pending):
+            if future.done():
+                continue
+            if index in failures:
+                future.set_exception(failures[index])
+            else:
+                future.set_result(doc['_id'])
+    
     async def insert_alert(self, alert_data: Dict[str, Any]) -> str:
         """Insert a new alert (alias for create_alert)"""
         return await self.create_alert(alert_data)
     
+    @_requires_conn
     async def update_alert(self, alert_id: str, update_data: Dict[str, Any]) -> bool:
         """Update alert with any data"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
+            # A malformed id cannot match any document
+            if not ObjectId.is_valid(alert_id):
+                return False
             
-            from bson import ObjectId
-            result = await self.alerts_collection.update_one(
-                {'_id': ObjectId(alert_id)},
-                {'$set': update_data}
-            )
+            matched = await self._queue_update(ObjectId(alert_id), {'$set': update_data})
             
-            return result.modified_count > 0
+            self._alert_cache.pop(alert_id)
+            return matched
             
         except Exception as e:
-            logger.error(f"Error updating alert {alert_id}: {e}")
+            logger.error("Error updating alert %s: %s", alert_id, e)
             raise
     
-    async def get_all_alerts(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all alerts"""
+    async def _queue_update(self, object_id, update: Dict[str, Any]) -> bool:
+        """Queue an alert update for the next bulk_write and wait for it
+        
+        Resolves to whether the alert exists (matched), not whether the update
+        changed any field. Callers needing modified_count should use update_one.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending_updates.append((object_id, update, future))
+        
+        if len(self._pending_updates) >= Config.UPDATE_BATCH_MAX_SIZE:
+            batch, self._pending_updates = self._pending_updates, []
+            self._start_write(self._write_updates(batch))
+        elif self._update_flush_task is None:
+            self._update_flush_task = self._start_write(self._flush_updates())
+        return await future
+    
+    async def _flush_updates(self):
+        """Write all queued alert updates once the batching window has passed"""
+        await asyncio.sleep(Config.UPDATE_BATCH_WINDOW_MS / 1000)
+        batch, self._pending_updates = self._pending_updates, []
+        self._update_flush_task = None
+        if batch:
+            await self._write_updates(batch)
+    
+    async def _write_updates(self, batch: List[tuple]):
+        """Apply a batch of updates with one unordered bulk_write and resolve each caller"""
+        # Updates to the same alert are merged in arrival order into a single
+        # operation: an unordered bulk_write does not keep the order of two
+        # operations on one document, and a later $set must win
+        merged: Dict[ObjectId, Dict[str, Dict[str, Any]]] = {}
+        for object_id, update, _ in batch:
+            target = merged.setdefault(object_id, {})
+            for operator, fields in update.items():
+                target.setdefault(operator, {}).update(fields)
+        object_ids = list(merged)
+        operations = [UpdateOne({'_id': object_id}, merged[object_id]) for object_id in object_ids]
+        
+        failures = {}
+        try:
+            result = await self.alerts_collection.bulk_write(operations, ordered=False)
+            matched_count = result.matched_count
+        except BulkWriteError as e:
+            concern_error = _write_concern_error(e)
+            if concern_error is not None:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(concern_error)
+                return
+            matched_count = e.details.get('nMatched', 0)
+            for error in e.details.get('writeErrors', []):
+                failures[object_ids[error['index']]] = OperationFailure(error.get('errmsg'), error.get('code'), error)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        # bulk_write only reports totals; when some updates matched nothing,
+        # look up which alerts exist to tell callers apart
+        if matched_count + len(failures) < len(object_ids):
+            try:
+                cursor = self.alerts_collection.find({'_id': {'$in': object_ids}}, {'_id': 1})
+                existing = {doc['_id'] async for doc in cursor}  # hex strings, see STRING_ID_CODEC_OPTIONS
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        else:
+            existing = None
+        
+        for object_id, _, future in batch:
+            if future.done():
+                continue
+            if object_id in failures:
+                future.set_exception(failures[object_id])
+            else:
+                future.set_result(existing is None or str(object_id) in existing)
+    
+    @staticmethod
+    def _normalize(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Make a document JSON-ready in place: _id becomes a string id, dates become ISO strings
+        
+        For reads that are not built from an aggregation with _serialized_stages.
+        """
+        if '_id' in doc:
+            # Already a string when read through STRING_ID_CODEC_OPTIONS
+            doc['id'] = str(doc.pop('_id'))
+        for field in ('created_at', 'updated_at', 'timestamp'):
+            value = doc.get(field)
+            if isinstance(value, datetime):
+                doc[field] = value.isoformat()
+        return doc
+    
+    @_requires_conn
+    async def mark_alert_responded(self, alert_id: str, actions: List[Any]) -> bool:
+        """Record an application's response (RL model actions) on an alert"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
-            cursor = self.alerts_collection.find().sort('created_at', -1).limit(limit)
-            alerts = await cursor.to_list(length=limit)
+            if not ObjectId.is_valid(alert_id):
+                return False
             
-            # Convert ObjectId to string and datetime to ISO format for JSON serialization
-            for alert in alerts:
-                if '_id' in alert:
-                    alert['id'] = str(alert['_id'])
-                    del alert['_id']
-                
-                # Convert datetime fields to ISO format strings
-                if 'created_at' in alert and isinstance(alert['created_at'], datetime):
-                    alert['created_at'] = alert['created_at'].isoformat()
-                if 'updated_at' in alert and isinstance(alert['updated_at'], datetime):
-                    alert['updated_at'] = alert['updated_at'].isoformat()
+            # Same queue as the other alert updates, so writes apply in arrival order
+            matched = await self._queue_update(
+                ObjectId(alert_id), {'$set': {**self.RESPONDED_FIELDS, 'actions': actions}}
+            )
             
-            return alerts
+            self._alert_cache.pop(alert_id)
+            return matched
             
         except Exception as e:
-            logger.error(f"Error getting alerts: {e}")
+            logger.error("Error marking alert %s responded: %s", alert_id, e)
             raise
     
-    async def get_alert(self, alert_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific alert by ID"""
+    async def iter_alerts(self, limit: int = 100, projection: Optional[Dict[str, Any]] = None,
+                          batch_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Yield alerts newest first as the cursor delivers them, without buffering the result"""
+        if not self.is_connected:
+            raise ConnectionFailure("Database not connected")
+        
+        # Let the server convert ObjectId and datetime fields for JSON serialization
+        pipeline = [{'$sort': {'created_at': -1}}, {'$limit': limit}]
+        if projection:
+            pipeline.append({'$project': projection})
+        pipeline.extend(_alert_stages())
+        
+        cursor = self.alert_reads_collection.aggregate(pipeline, batchSize=batch_size)
+        async for alert in cursor:
+            yield alert
+    
+    async def get_all_alerts(self, limit: int = 100, projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Get all alerts, optionally restricted to the fields in projection"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
-            from bson import ObjectId
-            alert = await self.alerts_collection.find_one({'_id': ObjectId(alert_id)})
-            
-            if alert:
-                alert['id'] = str(alert['_id'])
-                del alert['_id']
-                
-                # Convert datetime fields to ISO format strings
-                if 'created_at' in alert and isinstance(alert['created_at'], datetime):
-                    alert['created_at'] = alert['created_at'].isoformat()
-                if 'updated_at' in alert and isinstance(alert['updated_at'], datetime):
-                    alert['updated_at'] = alert['updated_at'].isoformat()
-            
-            return alert
+            # One batch holds the whole result, so no getMore round-trips
+            return [alert async for alert in self.iter_alerts(limit, projection, batch_size=limit)]
             
         except Exception as e:
-            logger.error(f"Error getting alert {alert_id}: {e}")
+            logger.error("Error getting alerts: %s", e)
             raise
     
-    async def update_alert_response(self, alert_id: str, response_data: Dict[str, Any]) -> bool:
-        """Update alert response"""
+    @_requires_conn
+    async def get_alert(self, alert_id: str, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Get a specific alert by ID, optionally restricted to the fields in projection
+        
+        Only full (detail view) reads go through the alert cache.
+        """
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
-            from bson import ObjectId
-            result = await self.alerts_collection.update_one(
-                {'_id': ObjectId(alert_id)},
-                {'$set': response_data}
-            )
-            
-            return result.modified_count > 0
+            if not ObjectId.is_valid(alert_id):
+                return None
+            
+            if projection is None:
+                cached = self._alert_cache.get(alert_id)
+                if cached is not None:
+                    return dict(cached)
+            
+            # Let the server convert ObjectId and datetime fields for JSON serialization
+            pipeline = [{'$match': {'_id': ObjectId(alert_id)}}]
+            if projection:
+                pipeline.append({'$project': projection})
+            pipeline.extend(_alert_stages())
+            
+            alerts = await self.alerts_collection.aggregate(pipeline).to_list(length=1)
+            if not alerts:
+                return None
+            
+            alert = alerts[0]
+            if projection is None:
+                self._alert_cache.set(alert_id, dict(alert))
+            return alert
             
         except Exception as e:
-            logger.error(f"Error updating alert response: {e}")
+            logger.error("Error getting alert %s: %s", alert_id, e)
             raise
     
-    async def update_alert_image(self, alert_id: str, image_data: Dict[str, Any]) -> bool:
-        """Update alert image"""
+    @_requires_conn
+    async def update_alert_fields(self, alert_id: str, **sections: Dict[str, Any]) -> bool:
+        """Apply several groups of alert fields (e.g. response=..., image=...) in one write"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
+            if not ObjectId.is_valid(alert_id):
+                return False
             
-            from bson import ObjectId
-            result = await self.alerts_collection.update_one(
-                {'_id': ObjectId(alert_id)},
-                {'$set': image_data}
-            )
+            fields = {key: value for section in sections.values() for key, value in section.items()}
+            matched = await self._queue_update(ObjectId(alert_id), {'$set': fields})
             
-            return result.modified_count > 0
+            self._alert_cache.pop(alert_id)
+            return matched
             
         except Exception as e:
-            logger.error(f"Error updating alert image: {e}")
+            logger.error("Error updating alert %s (%s): %s", alert_id, ', '.join(sections), e)
             raise
     
+    async def update_alert_response(self, alert_id: str, response_data: Dict[str, Any]) -> bool:
+        """Update alert response"""
+        return await self.update_alert_fields(alert_id, response=response_data)
+    
+    async def update_alert_image(self, alert_id: str, image_data: Dict[str, Any]) -> bool:
+        """Update alert image"""
+        return await self.update_alert_fields(alert_id, image=image_data)
+    
     async def get_system_stats(self) -> Dict[str, Any]:
-        """Get system statistics"""
+        """Get system statistics
+        
+        Results are cached for Config.STATS_CACHE_TTL seconds and concurrent
+        callers wait for a single refresh instead of each querying.
+        """
         try:
             if not self.is_connected:
-                raise Exception("Database not connected")
+                raise ConnectionFailure("Database not connected")
             
-            total_alerts = await self.alerts_collection.count_documents({})
+            if self._stats_cache is not None and time.monotonic() < self._stats_expires_at:
+                return dict(self._stats_cache)
             
-            # Count alerts by status
-            pending_alerts = await self.alerts_collection.count_documents({'rl_responsed': 0})
-            responded_alerts = await self.alerts_collection.count_documents({'rl_responsed': 1})
-            
-            # Count unique drones
-            unique_drones = await self.alerts_collection.distinct('drone_id')
-            
-            return {
-                'total_alerts': total_alerts,
-                'pending_alerts': pending_alerts,
-                'responded_alerts': responded_alerts,
-                'active_drones': len(unique_drones),
-                'system_status': 'operational' if self.is_connected else 'disconnected',
-                'database_status': 'connected' if self.is_connected else 'disconnected',
-                'timestamp': datetime.utcnow().isoformat()
-            }
+            async with self._stats_lock:
+                # Another caller may have refreshed the stats while we waited
+                if self._stats_cache is not None and time.monotonic() < self._stats_expires_at:
+                    return dict(self._stats_cache)
+                
+                # The four queries are independent, so run them concurrently on
+                # separate pool connections. The unfiltered total comes from
+                # collection metadata; (rl_responsed, created_at) makes the status
+                # counts COUNT_SCANs; the leading $sort lets the drone_id-prefixed
+                # index serve the unique drone count (DISTINCT_SCAN)
+                total_alerts, pending_alerts, responded_alerts, drone_counts = await asyncio.gather(
+                    self.alert_reads_collection.estimated_document_count(),
+                    self.alert_reads_collection.count_documents({'rl_responsed': 0}),
+                    self.alert_reads_collection.count_documents({'rl_responsed': 1}),
+                    self.alert_reads_collection.aggregate([
+                        {'$sort': {'drone_id': 1}},
+                        {'$group': {'_id': '$drone_id'}},
+                        {'$count': 'n'}
+                    ]).to_list(length=1)
+                )
+                active_drones = drone_counts[0]['n'] if drone_counts else 0
+                
+                self._stats_cache = {
+                    'total_alerts': total_alerts,
+                    'pending_alerts': pending_alerts,
+                    'responded_alerts': responded_alerts,
+                    'active_drones': active_drones,
+                    'system_status': 'operational' if self.is_connected else 'disconnected',
+                    'database_status': 'connected' if self.is_connected else 'disconnected',
+                    'timestamp': utc_now_iso()
+                }
+                self._stats_expires_at = time.monotonic() + Config.STATS_CACHE_TTL
+                return dict(self._stats_cache)
             
         except Exception as e:
-            logger.error(f"Error getting system stats: {e}")
+            logger.error("Error getting system stats: %s", e)
             return {
                 'total_alerts': 0,
                 'pending_alerts': 0,
@@ -296,296 +698,437 @@ class DatabaseManager:
                 'system_status': 'error',
                 'database_status': 'error',
                 'error': str(e),
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': utc_now_iso()
             }
     
     async def start_change_stream(self, callback):
-        """Start MongoDB change stream to watch for alert updates"""
+        """Start MongoDB change stream to watch for alert updates
+        
+        The callback receives a list of change events: events that arrive
+        while an earlier batch is still being handled are delivered together.
+        If the stream fails it is reopened from the last seen resume token,
+        with exponential backoff, until disconnect() is called. After a
+        restart it resumes from the last checkpointed token.
+        """
+        if not self.is_connected:
+            logger.warning("Cannot start change stream: database not connected")
+            return
+        
+        if self._resume_token is None:
+            self._resume_token = await self._load_resume_token()
+        
+        # Hand events to the callback from a separate task so reading
+        # the stream never waits on a slow batch
+        changes = asyncio.Queue(maxsize=Config.CHANGE_STREAM_QUEUE_SIZE)
+        dispatcher = asyncio.create_task(self._dispatch_changes(changes, callback))
+        self._stopping = False
+        backoff = 1
+        
         try:
-            if not self.is_connected:
-                logger.warning("Cannot start change stream: database not connected")
-                return
-            
-            logger.info("Starting MongoDB change stream...")
-            
-            # Create change stream pipeline
-            pipeline = [
-                {
-                    '$match': {
-                        'operationType': {'$in': ['insert', 'update', 'replace']}
-                    }
-                }
-            ]
-            
-            self.change_stream = self.alerts_collection.watch(pipeline)
-            logger.info("MongoDB change stream created successfully")
-            
-            # Start listening for changes
-            async for change in self.change_stream:
+            while not self._stopping:
                 try:
-                    await callback(change)
-                except Exception as e:
-                    logger.error(f"Error in change stream callback: {e}")
+                    logger.info("Starting MongoDB change stream...")
+                    self.change_stream = self.alerts_collection.watch(
+                        self.CHANGE_STREAM_PIPELINE, resume_after=self._resume_token
+                    )
+                    logger.info("MongoDB change stream created successfully")
                     
+                    # Start listening for changes
+                    async for change in self.change_stream:
+                        self._resume_token = change['_id']
+                        self._alert_cache.pop(str(change.get('documentKey', {}).get('_id')))
+                        backoff = 1
+                        if changes.full():
+                            # A stale alert is worth less than a fresh one: drop the oldest
+                            changes.get_nowait()
+                            logger.warning("Change event queue full, dropped oldest event")
+                        changes.put_nowait(change)
+                    
+                except PyMongoError as e:
+                    if self._stopping:
+                        break
+                    # Check if it's a shutdown-related error
+                    if "operation was interrupted" in str(e) or "CursorKilled" in str(e):
+                        logger.info("Change stream interrupted - this is normal during shutdown")
+                    else:
+                        logger.error("Change stream error: %s", e)
+                    if isinstance(e, OperationFailure) and e.code == CHANGE_STREAM_HISTORY_LOST:
+                        logger.warning("Resume token no longer in the oplog, restarting change stream from now")
+                        self._resume_token = None
+                
+                if self._stopping:
+                    break
+                logger.info("Reopening change stream in %ss", backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                
         except Exception as e:
-            # Check if it's a shutdown-related error
-            if "operation was interrupted" in str(e) or "CursorKilled" in str(e):
-                logger.info("Change stream interrupted during shutdown - this is normal")
-            else:
-                logger.error(f"Error starting change stream: {e}")
+            logger.error("Error starting change stream: %s", e)
             # Don't re-raise the exception to avoid blocking startup
+        finally:
+            dispatcher.cancel()
+    
+    async def _dispatch_changes(self, changes: asyncio.Queue, callback):
+        """Deliver queued change events to the callback in batches
+        
+        Consecutive updates to the same document within a batch are merged
+        into a single update event.
+        """
+        delivered = 0
+        next_checkpoint = time.monotonic() + Config.CHANGE_STREAM_CHECKPOINT_INTERVAL
+        while True:
+            batch = []
+            pending_updates = {}  # document _id -> its update event in batch
+            change = await changes.get()
+            while True:
+                last_token = change['_id']
+                doc_id = change.get('documentKey', {}).get('_id')
+                if change.get('operationType') == 'update':
+                    previous = pending_updates.get(doc_id)
+                    if previous is not None:
+                        self._merge_update(previous, change)
+                    else:
+                        pending_updates[doc_id] = change
+                        batch.append(change)
+                else:
+                    pending_updates.pop(doc_id, None)
+                    batch.append(change)
+                
+                if len(batch) >= Config.CHANGE_STREAM_BATCH_SIZE or changes.empty():
+                    break
+                change = changes.get_nowait()
+            
+            try:
+                await callback(batch)
+            except Exception as e:
+                logger.error("Error in change stream callback: %s", e)
+            
+            self._delivered_token = last_token
+            delivered += len(batch)
+            # Checkpoint after enough events, or after a quiet spell so that
+            # low traffic does not leave the saved token far behind
+            if (delivered >= Config.CHANGE_STREAM_CHECKPOINT_EVERY
+                    or time.monotonic() >= next_checkpoint):
+                delivered = 0
+                next_checkpoint = time.monotonic() + Config.CHANGE_STREAM_CHECKPOINT_INTERVAL
+                await self._save_resume_token(last_token)
+    
+    async def _load_resume_token(self):
+        """Resume token saved by an earlier run, or None to start from now"""
+        try:
+            state = await self.change_stream_state_collection.find_one({'_id': Config.ALERTS_COLLECTION})
+            return state.get('resume_token') if state else None
+        except Exception as e:
+            logger.warning("Could not load change stream resume token: %s", e)
+            return None
+    
+    async def _save_resume_token(self, token):
+        """Checkpoint the token of the last delivered event so a restart resumes after it"""
+        try:
+            await self.change_stream_state_collection.update_one(
+                {'_id': Config.ALERTS_COLLECTION},
+                {'$set': {'resume_token': token, 'updated_at': datetime.utcnow()}},
+                upsert=True
+            )
+            self._saved_token = token
+        except Exception as e:
+            logger.warning("Could not save change stream resume token: %s", e)
 
+    @staticmethod
+    def _merge_update(target: Dict[str, Any], change: Dict[str, Any]):
+        """Fold a later update event into an earlier one for the same document"""
+        target_desc = target.setdefault('updateDescription', {})
+        change_desc = change.get('updateDescription', {})
+        updated = target_desc.setdefault('updatedFields', {})
+        removed = target_desc.setdefault('removedFields', [])
+        
+        for field in change_desc.get('removedFields', []):
+            updated.pop(field, None)
+            if field not in removed:
+                removed.append(field)
+        for field, value in change_desc.get('updatedFields', {}).items():
+            updated[field] = value
+            if field in removed:
+                removed.remove(field)
+
+    @_requires_conn
     async def fix_database_schema(self):
         """Fix database schema issues"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
             logger.info("Fixing database schema...")
             
-            # Drop the problematic alert_id index if it exists
-            try:
-                await self.alerts_collection.drop_index("alert_id_1")
-                logger.info("Dropped problematic alert_id index")
-            except Exception as e:
-                logger.info(f"alert_id index not found or already dropped: {e}")
-            
-            # Create a proper index on alert_id that allows null values
-            try:
-                await self.alerts_collection.create_index("alert_id", unique=True, sparse=True)
-                logger.info("Created proper alert_id index with sparse option")
-            except Exception as e:
-                logger.info(f"alert_id index creation: {e}")
-            
-            # Create other useful indexes
-            try:
-                await self.alerts_collection.create_index("drone_id")
-                await self.alerts_collection.create_index("created_at")
-                await self.alerts_collection.create_index("status")
-                logger.info("Created additional indexes")
-            except Exception as e:
-                logger.info(f"Additional index creation: {e}")
-            
-            # Create indexes for alert images collection
-            try:
-                await self.alert_images_collection.create_index("drone_id")
-                await self.alert_images_collection.create_index("timestamp")
-                await self.alert_images_collection.create_index("found")
-                await self.alert_images_collection.create_index("name")
-                logger.info("Created alert images indexes")
-            except Exception as e:
-                logger.info(f"Alert images index creation: {e}")
-            
-            # Create indexes for processing tasks collection
-            try:
-                await self.processing_tasks_collection.create_index("task_id", unique=True)
-                await self.processing_tasks_collection.create_index("app_id")
-                await self.processing_tasks_collection.create_index("drone_id")
-                await self.processing_tasks_collection.create_index("status")
-                await self.processing_tasks_collection.create_index("created_at")
-                logger.info("Created processing tasks indexes")
-            except Exception as e:
-                logger.info(f"Processing tasks index creation: {e}")
+            # Validators first: an index build creates a missing collection
+            # implicitly, which would make _apply_validator's create_collection fail
+            await asyncio.gather(
+                self._apply_validator(Config.ALERTS_COLLECTION, self.ALERT_VALIDATOR),
+                self._apply_validator(Config.PROCESSING_TASKS_COLLECTION, self.PROCESSING_TASK_VALIDATOR)
+            )
             
-            # Create indexes for processing results collection
-            try:
-                await self.processing_results_collection.create_index("task_id", unique=True)
-                await self.processing_results_collection.create_index("drone_id")
-                await self.processing_results_collection.create_index("timestamp")
-                logger.info("Created processing results indexes")
-            except Exception as e:
-                logger.info(f"Processing results index creation: {e}")
+            # Collections are independent, so their index builds run concurrently
+            await asyncio.gather(
+                self._fix_alert_indexes(),
+                self._create_indexes("alert images", self.alert_images_collection, [
+                    IndexModel("drone_id"),
+                    IndexModel("timestamp"),
+                    IndexModel("found"),
+                    IndexModel("name"),
+                    IndexModel(self.CREATED_AT_INDEX),
+                    IndexModel(self.IMAGES_BY_DRONE_INDEX)
+                ]),
+                self._fix_processing_task_indexes(),
+                # Unique task_id on its own so duplicates cannot block the others
+                self._create_indexes("result task_id", self.processing_results_collection, [
+                    IndexModel("task_id", unique=True)
+                ]),
+                self._create_indexes("processing results", self.processing_results_collection, [
+                    IndexModel("drone_id"),
+                    IndexModel("timestamp"),
+                    IndexModel(self.RESULTS_BY_DRONE_INDEX)
+                ])
+            )
             
             logger.info("Database schema fixed successfully")
             
         except Exception as e:
-            logger.error(f"Error fixing database schema: {e}")
+            logger.error("Error fixing database schema: %s", e)
             raise
 
+    async def _apply_validator(self, collection_name: str, validator: Dict[str, Any]):
+        """Install a collection validator, creating the collection if it does not exist yet"""
+        try:
+            # 'moderate' leaves documents stored before the validator untouched
+            await self.db.command(
+                'collMod', collection_name,
+                validator=validator, validationLevel='moderate'
+            )
+            logger.info("Applied %s validator", collection_name)
+        except OperationFailure as e:
+            if e.code != NAMESPACE_NOT_FOUND:
+                logger.info("%s validator: %s", collection_name, e)
+                return
+            try:
+                await self.db.create_collection(
+                    collection_name, validator=validator, validationLevel='moderate'
+                )
+                logger.info("Created %s with validator", collection_name)
+            except Exception as create_error:
+                logger.info("%s validator: %s", collection_name, create_error)
+        except Exception as e:
+            logger.info("%s validator: %s", collection_name, e)
+    
+    async def _fix_alert_indexes(self):
+        """Replace the old alert indexes, dropping superseded ones only once their replacement exists"""
+        # The problematic alert_id index must go before the new one can be built
+        try:
+            await self.alerts_collection.drop_index("alert_id_1")
+            logger.info("Dropped problematic alert_id index")
+        except Exception as e:
+            logger.info("alert_id index not found or already dropped: %s", e)
+        
+        # alert_id gets its own command: existing duplicates can make the unique
+        # build fail, and that must not take the other alert indexes down with it
+        _, created = await asyncio.gather(
+            self._create_indexes("alert_id", self.alerts_collection, [
+                # A proper index on alert_id that allows null values
+                IndexModel("alert_id", unique=True, sparse=True)
+            ]),
+            self._create_indexes("alerts", self.alerts_collection, [
+                # Equality (drone_id, rl_responsed) before sort (created_at); the
+                # drone_id prefix also serves the $sort/$group unique drone count
+                IndexModel([("drone_id", 1), ("rl_responsed", 1), ("created_at", -1)]),
+                IndexModel(self.CREATED_AT_INDEX),
+                # Fleet-wide pending/responded counts
+                IndexModel(self.RESPONDED_INDEX)
+            ])
+        )
+        if not created:
+            logger.info("Keeping single-field alert indexes until the compound index exists")
+            return
+        
+        # Superseded by the compound index (drone_id) or unused by any query (status)
+        await asyncio.gather(
+            self.alerts_collection.drop_index("drone_id_1"),
+            self.alerts_collection.drop_index("status_1"),
+            return_exceptions=True
+        )
+    
+    async def _fix_processing_task_indexes(self):
+        """Replace the single-field task indexes with the pending-tasks compound index"""
+        # task_id gets its own command, as alert_id does: duplicate task ids
+        # must not stop the compound index from being built
+        created, _ = await asyncio.gather(
+            self._create_indexes("processing tasks", self.processing_tasks_collection, [
+                IndexModel("app_id"),
+                IndexModel(self.PENDING_TASKS_INDEX)
+            ]),
+            self._create_indexes("task_id", self.processing_tasks_collection, [
+                IndexModel("task_id", unique=True)
+            ])
+        )
+        if not created:
+            logger.info("Keeping single-field task indexes until the compound index exists")
+            return
+        
+        # Every query on these fields is served by PENDING_TASKS_INDEX; keeping
+        # them would only add write amplification
+        await asyncio.gather(
+            self.processing_tasks_collection.drop_index("drone_id_1"),
+            self.processing_tasks_collection.drop_index("status_1"),
+            self.processing_tasks_collection.drop_index("created_at_1"),
+            return_exceptions=True
+        )
+    
+    async def _create_indexes(self, label: str, collection, indexes: List[IndexModel]) -> bool:
+        """Create a collection's indexes with one createIndexes command, logging failures"""
+        try:
+            await collection.create_indexes(indexes)
+            logger.info("Created %s indexes", label)
+            return True
+        except Exception as e:
+            logger.info("%s index creation: %s", label.capitalize(), e)
+            return False
+
+    @_requires_conn
     async def create_alert_image(self, alert_image_data: Dict[str, Any]) -> str:
         """Create a new alert image record"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
             # Add created_at field
             alert_image_data['created_at'] = datetime.utcnow()
             
             result = await self.alert_images_collection.insert_one(alert_image_data)
-            logger.info(f"Created alert image with ID: {result.inserted_id}")
+            logger.info("Created alert image with ID: %s", result.inserted_id)
             return str(result.inserted_id)
             
         except Exception as e:
-            logger.error(f"Error creating alert image: {e}")
+            logger.error("Error creating alert image: %s", e)
             raise
 
-    async def get_all_alert_images(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all alert images"""
+    @_requires_conn
+    async def get_all_alert_images(self, limit: int = 100, include_images: bool = True) -> List[Dict[str, Any]]:
+        """Get all alert images; include_images=False leaves out the image blobs"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
-            cursor = self.alert_images_collection.find().sort('created_at', -1).limit(limit)
-            alert_images = await cursor.to_list(length=limit)
-            
-            # Convert ObjectId to string and datetime to ISO format for JSON serialization
-            for alert_image in alert_images:
-                if '_id' in alert_image:
-                    alert_image['id'] = str(alert_image['_id'])
-                    del alert_image['_id']
-                
-                # Convert datetime fields to ISO format strings
-                if 'created_at' in alert_image and isinstance(alert_image['created_at'], datetime):
-                    alert_image['created_at'] = alert_image['created_at'].isoformat()
-            
-            return alert_images
+            # Let the server convert ObjectId and datetime fields for JSON serialization
+            pipeline = [{'$sort': {'created_at': -1}}, {'$limit': limit}]
+            if not include_images:
+                pipeline.append({'$project': self.ALERT_IMAGE_SUMMARY_PROJECTION})
+            pipeline.extend(_serialized_stages('created_at'))
+            cursor = self.alert_images_collection.aggregate(pipeline, batchSize=limit)
+            return await cursor.to_list(length=limit)
             
         except Exception as e:
-            logger.error(f"Error getting alert images: {e}")
+            logger.error("Error getting alert images: %s", e)
             raise
 
+    @_requires_conn
     async def get_alert_image(self, alert_image_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific alert image by ID"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
-            from bson import ObjectId
-            alert_image = await self.alert_images_collection.find_one({'_id': ObjectId(alert_image_id)})
-            
-            if alert_image:
-                alert_image['id'] = str(alert_image['_id'])
-                del alert_image['_id']
-                
-                # Convert datetime fields to ISO format strings
-                if 'created_at' in alert_image and isinstance(alert_image['created_at'], datetime):
-                    alert_image['created_at'] = alert_image['created_at'].isoformat()
+            if not ObjectId.is_valid(alert_image_id):
+                return None
             
-            return alert_image
+            # Let the server convert ObjectId and datetime fields for JSON serialization
+            pipeline = [
+                {'$match': {'_id': ObjectId(alert_image_id)}},
+                *_serialized_stages('created_at')
+            ]
+            alert_images = await self.alert_images_collection.aggregate(pipeline).to_list(length=1)
+            return alert_images[0] if alert_images else None
             
         except Exception as e:
-            logger.error(f"Error getting alert image {alert_image_id}: {e}")
+            logger.error("Error getting alert image %s: %s", alert_image_id, e)
             raise
 
-    async def get_alert_images_by_drone(self, drone_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get alert images by drone ID"""
+    @_requires_conn
+    async def get_alert_images_by_drone(self, drone_id: str, limit: int = 50, include_images: bool = True) -> List[Dict[str, Any]]:
+        """Get alert images by drone ID; include_images=False leaves out the image blobs"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
-            cursor = self.alert_images_collection.find({'drone_id': drone_id}).sort('created_at', -1).limit(limit)
-            alert_images = await cursor.to_list(length=limit)
-            
-            # Convert ObjectId to string and datetime to ISO format for JSON serialization
-            for alert_image in alert_images:
-                if '_id' in alert_image:
-                    alert_image['id'] = str(alert_image['_id'])
-                    del alert_image['_id']
-                
-                # Convert datetime fields to ISO format strings
-                if 'created_at' in alert_image and isinstance(alert_image['created_at'], datetime):
-                    alert_image['created_at'] = alert_image['created_at'].isoformat()
-            
-            return alert_images
+            # Let the server convert ObjectId and datetime fields for JSON serialization
+            pipeline = [
+                {'$match': {'drone_id': drone_id}},
+                {'$sort': {'created_at': -1}},
+                {'$limit': limit}
+            ]
+            if not include_images:
+                pipeline.append({'$project': self.ALERT_IMAGE_SUMMARY_PROJECTION})
+            pipeline.extend(_serialized_stages('created_at'))
+            cursor = self.alert_images_collection.aggregate(pipeline, batchSize=limit)
+            return await cursor.to_list(length=limit)
             
         except Exception as e:
-            logger.error(f"Error getting alert images by drone {drone_id}: {e}")
+            logger.error("Error getting alert images by drone %s: %s", drone_id, e)
             raise
 
+    @_requires_conn
     async def delete_alert_image(self, alert_image_id: str) -> bool:
         """Delete an alert image by ID"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
+            if not ObjectId.is_valid(alert_image_id):
+                return False
             
-            from bson import ObjectId
             result = await self.alert_images_collection.delete_one({'_id': ObjectId(alert_image_id)})
             
             return result.deleted_count > 0
             
         except Exception as e:
-            logger.error(f"Error deleting alert image {alert_image_id}: {e}")
+            logger.error("Error deleting alert image %s: %s", alert_image_id, e)
             raise
 
     # Processing Tasks Methods
+    @_requires_conn
     async def create_processing_task(self, task_data: Dict[str, Any]) -> str:
         """Create a new processing task"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
             # Generate task_id if not provided
-            if 'task_id' not in task_data or not task_data['task_id']:
-                import uuid
-                task_data['task_id'] = f"task_{uuid.uuid4().hex[:8]}"
+            if not task_data.get('task_id'):
+                task_data['task_id'] = new_task_id()
             
             # Add timestamps
             task_data['created_at'] = datetime.utcnow().isoformat()
             task_data['updated_at'] = task_data['created_at']
             
             # Set default status
-            if 'status' not in task_data:
-                task_data['status'] = 'pending'
+            task_data.setdefault('status', 'pending')
             
             result = await self.processing_tasks_collection.insert_one(task_data)
-            logger.info(f"Created processing task with ID: {task_data['task_id']}")
+            logger.info("Created processing task with ID: %s", task_data['task_id'])
             return task_data['task_id']
             
         except Exception as e:
-            logger.error(f"Error creating processing task: {e}")
+            logger.error("Error creating processing task: %s", e)
             raise
 
+    @_requires_conn
     async def get_processing_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific processing task by ID"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
             task = await self.processing_tasks_collection.find_one({'task_id': task_id})
             
-            if task:
-                # Convert ObjectId to string
-                if '_id' in task:
-                    task['id'] = str(task['_id'])
-                    del task['_id']
-            
-            return task
+            return self._normalize(task) if task else None
             
         except Exception as e:
-            logger.error(f"Error getting processing task {task_id}: {e}")
+            logger.error("Error getting processing task %s: %s", task_id, e)
             raise
 
+    @_requires_conn
     async def get_pending_tasks_for_drone(self, drone_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get pending tasks for a specific drone"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
             cursor = self.processing_tasks_collection.find({
                 'drone_id': drone_id,
                 'status': 'pending'
-            }).sort('priority', -1).sort('created_at', 1).limit(limit)
+            }).sort([('priority', -1), ('created_at', 1)]).limit(limit).batch_size(limit)
             
             tasks = await cursor.to_list(length=limit)
-            
-            # Convert ObjectId to string
-            for task in tasks:
-                if '_id' in task:
-                    task['id'] = str(task['_id'])
-                    del task['_id']
-            
-            return tasks
+            return [self._normalize(task) for task in tasks]
             
         except Exception as e:
-            logger.error(f"Error getting pending tasks for drone {drone_id}: {e}")
+            logger.error("Error getting pending tasks for drone %s: %s", drone_id, e)
             raise
 
+    @_requires_conn
     async def update_task_status(self, task_id: str, status: str, additional_data: Optional[Dict[str, Any]] = None) -> bool:
         """Update task status"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
             update_data = {
                 'status': status,
                 'updated_at': datetime.utcnow().isoformat()
@@ -602,67 +1145,49 @@ class DatabaseManager:
             return result.modified_count > 0
             
         except Exception as e:
-            logger.error(f"Error updating task status {task_id}: {e}")
+            logger.error("Error updating task status %s: %s", task_id, e)
             raise
 
     # Processing Results Methods
+    @_requires_conn
     async def create_processing_result(self, result_data: Dict[str, Any]) -> str:
         """Create a new processing result"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
             # Add timestamp if not present
             if 'timestamp' not in result_data:
                 result_data['timestamp'] = datetime.utcnow().isoformat()
             
             result = await self.processing_results_collection.insert_one(result_data)
-            logger.info(f"Created processing result for task: {result_data.get('task_id', 'unknown')}")
+            logger.info("Created processing result for task: %s", result_data.get('task_id', 'unknown'))
             return str(result.inserted_id)
             
         except Exception as e:
-            logger.error(f"Error creating processing result: {e}")
+            logger.error("Error creating processing result: %s", e)
             raise
 
+    @_requires_conn
     async def get_processing_result(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get processing result by task ID"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
             result = await self.processing_results_collection.find_one({'task_id': task_id})
             
-            if result:
-                # Convert ObjectId to string
-                if '_id' in result:
-                    result['id'] = str(result['_id'])
-                    del result['_id']
-            
-            return result
+            return self._normalize(result) if result else None
             
         except Exception as e:
-            logger.error(f"Error getting processing result for task {task_id}: {e}")
+            logger.error("Error getting processing result for task %s: %s", task_id, e)
             raise
 
+    @_requires_conn
     async def get_results_by_drone(self, drone_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get processing results by drone ID"""
         try:
-            if not self.is_connected:
-                raise Exception("Database not connected")
-            
-            cursor = self.processing_results_collection.find({'drone_id': drone_id}).sort('timestamp', -1).limit(limit)
+            cursor = self.processing_results_collection.find({'drone_id': drone_id}).sort('timestamp', -1) \
+                .limit(limit).batch_size(limit)
             results = await cursor.to_list(length=limit)
-            
-            # Convert ObjectId to string
-            for result in results:
-                if '_id' in result:
-                    result['id'] = str(result['_id'])
-                    del result['_id']
-            
-            return results
+            return [self._normalize(result) for result in results]
             
         except Exception as e:
-            logger.error(f"Error getting results by drone {drone_id}: {e}")
+            logger.error("Error getting results by drone %s: %s", drone_id, e)
             raise
 
 # Create global database manager instance
@@ -4,14 +4,26 @@ Example Application Client
 Simulates an application that receives alerts and sends responses via WebSocket
 """
 
+import argparse
 import asyncio
 import websockets
 import json
+import orjson
 import uuid
 import time
 from datetime import datetime
 from typing import Dict, Any, List
 
+NEW_ALERT_TEMPLATE = (
+    "\n=== NEW ALERT RECEIVED ===\n"
+    "Alert ID: {alert_id}\n"
+    "Type: {alert_type}\n"
+    "Score: {score:.2f}\n"
+    "Location: {location}\n"
+    "Description: {description}\n"
+    + "=" * 30
+)
+
 class ApplicationClient:
     def __init__(self, app_id: str, server_url: str = "wss://droneserver-5pfg.onrender.com"):
         self.app_id = app_id
@@ -112,13 +124,13 @@ class ApplicationClient:
         score = alert_data.get("score", 0.0)
         location = alert_data.get("location", {})
         
-        print(f"\n=== NEW ALERT RECEIVED ===")
-        print(f"Alert ID: {alert_id}")
-        print(f"Type: {alert_type}")
-        print(f"Score: {score:.2f}")
-        print(f"Location: {location}")
-        print(f"Description: {alert_data.get('description', 'N/A')}")
-        print("=" * 30)
+        print(NEW_ALERT_TEMPLATE.format(
+            alert_id=alert_id,
+            alert_type=alert_type,
+            score=score,
+            location=location,
+            description=alert_data.get('description', 'N/A')
+        ))
         
         # Store alert for processing
         self.pending_alerts[alert_id] = alert_data
@@ -177,7 +189,7 @@ class ApplicationClient:
         try:
             async for message in self.websocket:
                 try:
-                    data = json.loads(message)
+                    data = orjson.loads(message)
                     message_type = data.get("type")
                     
                     if message_type == "connection_established":
@@ -185,9 +197,9 @@ class ApplicationClient:
                     
                     elif message_type == "initial_alerts":
                         alerts = data.get("alerts", [])
-                        print(f"Received {len(alerts)} initial alerts")
-                        for alert in alerts:
-                            print(f"  - {alert.get('alert_id')}: {alert.get('alert_type')}")
+                        lines = [f"Received {len(alerts)} initial alerts"]
+                        lines.extend(f"  - {alert.get('alert_id')}: {alert.get('alert_type')}" for alert in alerts)
+                        print("\n".join(lines))
                     
                     elif message_type == "new_alert":
                         alert_data = data.get("alert", {})
@@ -207,7 +219,7 @@ class ApplicationClient:
                     else:
                         print(f"Received message: {data}")
                         
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     print(f"Invalid JSON received: {message}")
                     
         except websockets.exceptions.ConnectionClosed:
@@ -238,13 +250,22 @@ class ApplicationClient:
             listen_task.cancel()
             await self.disconnect()
 
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Example application client")
+    parser.add_argument("--app-id", help="Application ID (skips the interactive prompt)")
+    parser.add_argument("--server", help="Server URL, e.g. wss://your-server.com")
+    return parser.parse_args()
+
 async def main():
     """Main function to run the application client"""
-    app_id = input("Enter application ID (or press Enter for auto-generated): ").strip()
+    args = parse_args()
+    
+    app_id = args.app_id or input("Enter application ID (or press Enter for auto-generated): ").strip()
     if not app_id:
         app_id = f"app_{uuid.uuid4().hex[:8]}"
     
-    app = ApplicationClient(app_id)
+    app = ApplicationClient(app_id, args.server) if args.server else ApplicationClient(app_id)
     await app.run()
 
 if __name__ == "__main__":
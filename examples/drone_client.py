@@ -4,6 +4,7 @@ Example Drone Client
 Simulates a drone that sends alerts and receives commands via WebSocket
 """
 
+import argparse
 import asyncio
 import websockets
 import json
@@ -305,15 +306,35 @@ class DroneClient:
             await self.disconnect()
             print("✅ Drone client stopped successfully")
 
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Example drone client")
+    parser.add_argument("--drone-id", help="Drone ID (skips the interactive prompt)")
+    parser.add_argument("--server", help="Server URL, e.g. wss://your-server.com (skips the interactive prompt)")
+    return parser.parse_args()
+
 async def main():
     """Main function to run the drone client"""
+    args = parse_args()
+    
+    # Non-interactive mode: everything was given on the command line
+    if args.drone_id and args.server:
+        drone = DroneClient(args.drone_id, args.server)
+        await drone.run()
+        return
+    
     print("🚁 Drone Client Setup")
     print("=" * 40)
     
-    drone_id = input("Enter drone ID (or press Enter for auto-generated): ").strip()
+    drone_id = args.drone_id or input("Enter drone ID (or press Enter for auto-generated): ").strip()
     if not drone_id:
         drone_id = f"drone_{uuid.uuid4().hex[:8]}"
     
+    if args.server:
+        drone = DroneClient(drone_id, args.server)
+        await drone.run()
+        return
+    
     print(f"\n🔧 Server Configuration:")
     print("1. Use Railway server (web-production-190fc.up.railway.app)")
     print("2. Use local server (localhost:8000)")
@@ -1,17 +1,15 @@
 import asyncio
 import logging
 import os
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-import json
+import orjson
 from typing import List, Dict, Any
-from datetime import datetime
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
 
 from config import Config
-from database import db_manager
+from database import db_manager, utc_now_iso
 from websocket_manager import websocket_manager
 from models import AlertCreate, AlertResponse, AlertImageUpdate, AlertImageCreate, ProcessingTaskCreate
 
@@ -43,46 +41,47 @@ async def lifespan(app: FastAPI):
         # Continue without database for now
     
     # Start change stream to watch for alert updates (non-blocking)
-    async def change_stream_callback(change_event: Dict[str, Any]):
-        """Callback function for database change stream events"""
-        try:
-            # Serialize the change event to make it JSON compatible
-            serialized_change = {}
-            
-            # Handle the change event structure
-            if 'operationType' in change_event:
-                serialized_change['operationType'] = change_event['operationType']
-            
-            if 'documentKey' in change_event:
-                # Convert ObjectId to string
-                if '_id' in change_event['documentKey']:
-                    serialized_change['documentKey'] = {
-                        '_id': str(change_event['documentKey']['_id'])
-                    }
-            
-            if 'fullDocument' in change_event:
-                # Serialize the full document
-                from websocket_manager import serialize_datetime
-                serialized_change['fullDocument'] = serialize_datetime(change_event['fullDocument'])
-            
-            if 'updateDescription' in change_event:
-                serialized_change['updateDescription'] = change_event['updateDescription']
-            
-            # Add timestamp
-            serialized_change['timestamp'] = datetime.utcnow().isoformat()
-            
-            # Broadcast the serialized change to all connected applications
-            await websocket_manager.broadcast_to_applications({
-                "type": "alert_update",
-                "change": serialized_change,
-                "timestamp": serialized_change['timestamp']
-            })
-        except Exception as e:
-            logger.error(f"Error in change stream callback: {e}")
+    async def change_stream_callback(change_events: List[Dict[str, Any]]):
+        """Callback function for a batch of database change stream events"""
+        # One timestamp for the whole batch
+        timestamp = utc_now_iso()
+        
+        for change_event in change_events:
+            try:
+                # Serialize the change event to make it JSON compatible
+                serialized_change = {}
+                
+                # Handle the change event structure
+                if 'operationType' in change_event:
+                    serialized_change['operationType'] = change_event['operationType']
+                
+                if 'documentKey' in change_event:
+                    # Convert ObjectId to string
+                    if '_id' in change_event['documentKey']:
+                        serialized_change['documentKey'] = {
+                            '_id': str(change_event['documentKey']['_id'])
+                        }
+                
+                if 'fullDocument' in change_event:
+                    serialized_change['fullDocument'] = change_event['fullDocument']
+                
+                if 'updateDescription' in change_event:
+                    serialized_change['updateDescription'] = change_event['updateDescription']
+                
+                # Add timestamp
+                serialized_change['timestamp'] = timestamp
+                
+                # Broadcast the serialized change to all connected applications
+                await websocket_manager.broadcast_to_applications({
+                    "type": "alert_update",
+                    "change": serialized_change,
+                    "timestamp": timestamp
+                })
+            except Exception as e:
+                logger.error(f"Error in change stream callback: {e}")
     
     # Start change stream in background task
     if db_manager.is_connected:
-        import asyncio
         asyncio.create_task(db_manager.start_change_stream(change_stream_callback))
         logger.info("Change stream started in background")
     
@@ -100,17 +99,87 @@ app = FastAPI(
     title="Drone Alert Management System",
     description="Real-time drone alert management with WebSocket communication and MongoDB Change Streams",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Precomputed CORS headers for the allow-all policy
+CORS_SIMPLE_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-credentials", b"true"),
+]
+CORS_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-max-age", b"600"),
+    (b"access-control-allow-credentials", b"true"),
+    (b"vary", b"Origin"),
+    (b"content-type", b"text/plain; charset=utf-8"),
+    (b"content-length", b"2"),
+]
+
+class StaticCORSMiddleware:
+    """Allow-all CORS middleware that appends precomputed headers.
+
+    Mirrors CORSMiddleware(allow_origins=["*"], allow_credentials=True,
+    allow_methods=["*"], allow_headers=["*"]) without rebuilding header
+    dicts on every request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_method = None
+        request_headers = None
+        has_cookie = False
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+            elif name == b"cookie":
+                has_cookie = True
+
+        # Not a cross-origin request
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Answer preflight requests directly
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            headers = [(b"access-control-allow-origin", origin), *CORS_PREFLIGHT_HEADERS]
+            if request_headers is not None:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": b"OK"})
+            return
+
+        # Credentialed requests must echo the origin instead of "*"
+        if has_cookie:
+            cors_headers = [
+                (b"access-control-allow-origin", origin),
+                (b"access-control-allow-credentials", b"true"),
+                (b"vary", b"Origin"),
+            ]
+        else:
+            cors_headers = CORS_SIMPLE_HEADERS
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *cors_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
 # Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(StaticCORSMiddleware)  # Configure appropriately for production
 
 # Create uploads directory if it doesn't exist
 os.makedirs(Config.UPLOAD_DIR, exist_ok=True)
@@ -121,36 +190,38 @@ app.mount("/uploads", StaticFiles(directory=Config.UPLOAD_DIR), name="uploads")
 @app.get("/dashboard/")
 async def dashboard():
     """Serve the dashboard"""
-    from fastapi.responses import FileResponse
     return FileResponse("dashboard/index.html")
 
 # Mount dashboard static files
 app.mount("/dashboard", StaticFiles(directory="dashboard"), name="dashboard")
 
+# The root payload never changes, so serialize it once at import time
+ROOT_RESPONSE_BODY = orjson.dumps({
+    "message": "Drone Alert Management System",
+    "version": "1.0.0",
+    "status": "running",
+    "endpoints": {
+        "dashboard": "/dashboard/",
+        "api_docs": "/docs",
+        "health": "/health",
+        "alerts": "/api/alerts",
+        "stats": "/api/stats"
+    }
+})
+
 @app.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "message": "Drone Alert Management System",
-        "version": "1.0.0",
-        "status": "running",
-        "endpoints": {
-            "dashboard": "/dashboard/",
-            "api_docs": "/docs",
-            "health": "/health",
-            "alerts": "/api/alerts",
-            "stats": "/api/stats"
-        }
-    }
+    return Response(content=ROOT_RESPONSE_BODY, media_type="application/json")
 
-@app.get("/health")
+@app.get("/health", response_model=None)
 async def health_check():
     """Health check endpoint"""
-    return {
+    return ORJSONResponse({
         "status": "healthy",
         "database_connected": db_manager.is_connected,
         "websocket_stats": websocket_manager.get_connection_stats()
-    }
+    })
 
 @app.websocket("/ws/drone/{drone_id}")
 async def websocket_drone_endpoint(websocket: WebSocket, drone_id: str):
@@ -170,14 +241,14 @@ async def websocket_drone_endpoint(websocket: WebSocket, drone_id: str):
             try:
                 # Receive message
                 data = await websocket.receive_text()
-                message_data = json.loads(data)
+                message_data = orjson.loads(data)
                 
                 # Handle the message
                 await websocket_manager.handle_websocket_message(client_id, message_data)
                 
             except WebSocketDisconnect:
                 break
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 logger.error(f"Invalid JSON received from drone {drone_id}")
                 continue
             except Exception as e:
@@ -207,16 +278,12 @@ async def websocket_application_endpoint(websocket: WebSocket, app_id: str):
         
         # Send current alerts to the new application
         try:
-            alerts = await db_manager.get_all_alerts(limit=50)
+            alerts = await db_manager.get_all_alerts(limit=50, projection=db_manager.ALERT_SUMMARY_PROJECTION)
             if alerts:
-                # Ensure alerts are properly serialized
-                from websocket_manager import serialize_datetime
-                serialized_alerts = serialize_datetime(alerts)
-                
                 initial_data_message = {
                     "type": "initial_alerts",
-                    "alerts": serialized_alerts,
-                    "timestamp": datetime.utcnow().isoformat()
+                    "alerts": alerts,
+                    "timestamp": utc_now_iso()
                 }
                 await websocket_manager.send_personal_message(client_id, initial_data_message)
         except Exception as e:
@@ -227,14 +294,14 @@ async def websocket_application_endpoint(websocket: WebSocket, app_id: str):
             try:
                 # Receive message
                 data = await websocket.receive_text()
-                message_data = json.loads(data)
+                message_data = orjson.loads(data)
                 
                 # Handle the message
                 await websocket_manager.handle_websocket_message(client_id, message_data)
                 
             except WebSocketDisconnect:
                 break
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 logger.error(f"Invalid JSON received from application {app_id}")
                 continue
             except Exception as e:
@@ -252,20 +319,22 @@ async def websocket_application_endpoint(websocket: WebSocket, app_id: str):
 # REST API endpoints for additional functionality
 
 @app.get("/api/alerts")
-async def get_alerts(limit: int = 100):
+async def get_alerts(limit: int = 100, include_images: bool = True):
     """Get all alerts via REST API"""
     try:
-        alerts = await db_manager.get_all_alerts(limit=limit)
+        projection = None if include_images else db_manager.ALERT_SUMMARY_PROJECTION
+        alerts = await db_manager.get_all_alerts(limit=limit, projection=projection)
         return {"alerts": alerts, "count": len(alerts)}
     except Exception as e:
         logger.error(f"Error getting alerts: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/alerts/{alert_id}")
-async def get_alert(alert_id: str):
+async def get_alert(alert_id: str, include_images: bool = True):
     """Get a specific alert by ID"""
     try:
-        alert = await db_manager.get_alert(alert_id)
+        projection = None if include_images else db_manager.ALERT_SUMMARY_PROJECTION
+        alert = await db_manager.get_alert(alert_id, projection=projection)
         if not alert:
             raise HTTPException(status_code=404, detail="Alert not found")
         return alert
@@ -275,18 +344,18 @@ async def get_alert(alert_id: str):
         logger.error(f"Error getting alert {alert_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.post("/api/alerts")
+@app.post("/api/alerts", response_model=None)
 async def create_alert(alert: AlertCreate):
     """Create a new alert via REST API"""
     try:
-        alert_data = alert.dict()
+        alert_data = alert.model_dump()
         alert_id = await db_manager.insert_alert(alert_data)
-        return {"alert_id": alert_id, "message": "Alert created successfully"}
+        return ORJSONResponse({"alert_id": alert_id, "message": "Alert created successfully"})
     except Exception as e:
         logger.error(f"Error creating alert: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.put("/api/alerts/{alert_id}/response")
+@app.put("/api/alerts/{alert_id}/response", response_model=None)
 async def update_alert_response(alert_id: str, response: AlertResponse):
     """Update alert response via REST API"""
     try:
@@ -295,18 +364,18 @@ async def update_alert_response(alert_id: str, response: AlertResponse):
             'status': 'responded'
         }
         
-        success = await db_manager.update_alert(alert_id, update_data)
+        success = await db_manager.update_alert_response(alert_id, update_data)
         if not success:
             raise HTTPException(status_code=404, detail="Alert not found")
         
-        return {"message": "Alert response updated successfully"}
+        return ORJSONResponse({"message": "Alert response updated successfully"})
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error updating alert response: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.put("/api/alerts/{alert_id}/image")
+@app.put("/api/alerts/{alert_id}/image", response_model=None)
 async def update_alert_image(alert_id: str, image_update: AlertImageUpdate):
     """Update alert image via REST API"""
     try:
@@ -316,35 +385,37 @@ async def update_alert_image(alert_id: str, image_update: AlertImageUpdate):
             'status': 'completed'
         }
         
-        success = await db_manager.update_alert(alert_id, update_data)
+        success = await db_manager.update_alert_image(alert_id, update_data)
         if not success:
             raise HTTPException(status_code=404, detail="Alert not found")
         
-        return {"message": "Alert image updated successfully"}
+        return ORJSONResponse({"message": "Alert image updated successfully"})
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error updating alert image: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/api/stats")
+@app.get("/api/stats", response_model=None)
 async def get_system_stats():
     """Get system statistics"""
     try:
         stats = websocket_manager.get_connection_stats()
-        return {
+        response = {
             "websocket_stats": stats,
             "database_connected": db_manager.is_connected
         }
+        if db_manager.is_connected:
+            response["alert_stats"] = await db_manager.get_system_stats()
+        return ORJSONResponse(response)
     except Exception as e:
         logger.error(f"Error getting system stats: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/debug/env")
+@app.get("/debug/env", response_model=None)
 async def debug_environment():
     """Debug endpoint to show environment variables (for troubleshooting)"""
-    import os
-    return {
+    return ORJSONResponse({
         "MONGODB_URI_set": bool(os.getenv('MONGODB_URI')),
         "DATABASE_NAME_set": bool(os.getenv('DATABASE_NAME')),
         "HOST_set": bool(os.getenv('HOST')),
@@ -356,25 +427,25 @@ async def debug_environment():
         "database_name": os.getenv('DATABASE_NAME', 'NOT_SET'),
         "host": os.getenv('HOST', 'NOT_SET'),
         "port": os.getenv('PORT', 'NOT_SET')
-    }
+    })
 
 # Alert Image Endpoints
-@app.post("/api/alert-images")
+@app.post("/api/alert-images", response_model=None)
 async def create_alert_image(alert_image: AlertImageCreate):
     """Create a new alert image via REST API"""
     try:
-        alert_image_data = alert_image.dict()
+        alert_image_data = alert_image.model_dump()
         alert_image_id = await db_manager.create_alert_image(alert_image_data)
-        return {"alert_image_id": alert_image_id, "message": "Alert image created successfully"}
+        return ORJSONResponse({"alert_image_id": alert_image_id, "message": "Alert image created successfully"})
     except Exception as e:
         logger.error(f"Error creating alert image: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/alert-images")
-async def get_alert_images(limit: int = 100):
+async def get_alert_images(limit: int = 100, include_images: bool = True):
     """Get all alert images via REST API"""
     try:
-        alert_images = await db_manager.get_all_alert_images(limit)
+        alert_images = await db_manager.get_all_alert_images(limit, include_images)
         return {"alert_images": alert_images, "count": len(alert_images)}
     except Exception as e:
         logger.error(f"Error getting alert images: {e}")
@@ -395,23 +466,23 @@ async def get_alert_image(alert_image_id: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/alert-images/drone/{drone_id}")
-async def get_alert_images_by_drone(drone_id: str, limit: int = 50):
+async def get_alert_images_by_drone(drone_id: str, limit: int = 50, include_images: bool = True):
     """Get alert images by drone ID via REST API"""
     try:
-        alert_images = await db_manager.get_alert_images_by_drone(drone_id, limit)
+        alert_images = await db_manager.get_alert_images_by_drone(drone_id, limit, include_images)
         return {"alert_images": alert_images, "count": len(alert_images), "drone_id": drone_id}
     except Exception as e:
         logger.error(f"Error getting alert images by drone {drone_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.delete("/api/alert-images/{alert_image_id}")
+@app.delete("/api/alert-images/{alert_image_id}", response_model=None)
 async def delete_alert_image(alert_image_id: str):
     """Delete an alert image by ID via REST API"""
     try:
         success = await db_manager.delete_alert_image(alert_image_id)
         if not success:
             raise HTTPException(status_code=404, detail="Alert image not found")
-        return {"message": "Alert image deleted successfully"}
+        return ORJSONResponse({"message": "Alert image deleted successfully"})
     except HTTPException:
         raise
     except Exception as e:
@@ -419,13 +490,13 @@ async def delete_alert_image(alert_image_id: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Processing Tasks and Results Endpoints
-@app.post("/api/processing-tasks")
+@app.post("/api/processing-tasks", response_model=None)
 async def create_processing_task(task: ProcessingTaskCreate):
     """Create a new processing task via REST API"""
     try:
-        task_data = task.dict()
+        task_data = task.model_dump()
         task_id = await db_manager.create_processing_task(task_data)
-        return {"task_id": task_id, "message": "Processing task created successfully"}
+        return ORJSONResponse({"task_id": task_id, "message": "Processing task created successfully"})
     except Exception as e:
         logger.error(f"Error creating processing task: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,251 @@
+import asyncio
+import unittest
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, WriteConcernError
+
+from database import DatabaseManager
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._docs:
+            raise StopAsyncIteration
+        return self._docs.pop(0)
+
+
+class FakeBulkResult:
+    def __init__(self, matched_count):
+        self.matched_count = matched_count
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the batched write paths"""
+
+    def __init__(self):
+        self.insert_calls = []
+        self.bulk_calls = []
+        self.update_calls = []
+        self.existing = set()  # hex ids that find() reports
+        self.error = None
+        self.matched_count = None
+        self.release = None  # asyncio.Event that holds writes until set
+
+    async def insert_many(self, docs, ordered=True):
+        self.insert_calls.append(docs)
+        if self.release is not None:
+            await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        for doc in docs:
+            doc.setdefault('_id', ObjectId())
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk_calls.append(operations)
+        if self.error is not None:
+            raise self.error
+        matched = len(operations) if self.matched_count is None else self.matched_count
+        return FakeBulkResult(matched)
+
+    async def update_one(self, query, update, upsert=False):
+        self.update_calls.append((query, update))
+
+    def find(self, query, projection=None):
+        ids = [str(object_id) for object_id in query['_id']['$in']]
+        return FakeCursor({'_id': id_str} for id_str in ids if id_str in self.existing)
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_manager():
+    manager = DatabaseManager()
+    manager.is_connected = True
+    manager.client = FakeClient()
+    manager.alerts_collection = FakeCollection()
+    manager.alert_inserts_collection = FakeCollection()
+    manager.change_stream_state_collection = FakeCollection()
+    return manager
+
+
+class InsertBatchingTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_inserts_share_one_insert_many(self):
+        manager = make_manager()
+        first, second = await asyncio.gather(
+            manager._queue_insert({'alert_id': 'a'}),
+            manager._queue_insert({'alert_id': 'b'})
+        )
+        self.assertEqual(len(manager.alert_inserts_collection.insert_calls), 1)
+        self.assertIsInstance(first, ObjectId)
+        self.assertNotEqual(first, second)
+
+    async def test_partial_bulk_write_error_fails_only_that_insert(self):
+        manager = make_manager()
+        manager.alert_inserts_collection.error = BulkWriteError({
+            'writeErrors': [{'index': 1, 'code': 11000, 'errmsg': 'duplicate key'}]
+        })
+        results = await asyncio.gather(
+            manager._queue_insert({'_id': ObjectId(), 'alert_id': 'a'}),
+            manager._queue_insert({'_id': ObjectId(), 'alert_id': 'b'}),
+            return_exceptions=True
+        )
+        self.assertIsInstance(results[0], ObjectId)
+        self.assertIsInstance(results[1], DuplicateKeyError)
+
+    async def test_write_concern_error_fails_every_insert(self):
+        manager = make_manager()
+        manager.alert_inserts_collection.error = BulkWriteError({
+            'writeErrors': [],
+            'writeConcernErrors': [{'code': 64, 'errmsg': 'waiting for replication timed out'}]
+        })
+        results = await asyncio.gather(
+            manager._queue_insert({'alert_id': 'a'}),
+            manager._queue_insert({'alert_id': 'b'}),
+            return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(result, WriteConcernError) for result in results))
+
+    async def test_generic_failure_fails_every_insert(self):
+        manager = make_manager()
+        manager.alert_inserts_collection.error = RuntimeError('network down')
+        results = await asyncio.gather(
+            manager._queue_insert({'alert_id': 'a'}),
+            manager._queue_insert({'alert_id': 'b'}),
+            return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+    async def test_disconnect_waits_for_in_flight_insert(self):
+        manager = make_manager()
+        manager.alert_inserts_collection.release = asyncio.Event()
+        insert = asyncio.create_task(manager._queue_insert({'alert_id': 'a'}))
+        while not manager.alert_inserts_collection.insert_calls:
+            await asyncio.sleep(0.001)
+
+        disconnect = asyncio.create_task(manager.disconnect())
+        await asyncio.sleep(0.01)
+        self.assertFalse(manager.client.closed)
+
+        manager.alert_inserts_collection.release.set()
+        await disconnect
+        self.assertIsInstance(await insert, ObjectId)
+        self.assertTrue(manager.client.closed)
+
+
+class UpdateBatchingTest(unittest.IsolatedAsyncioTestCase):
+    async def test_updates_to_one_alert_merge_in_arrival_order(self):
+        manager = make_manager()
+        alert_id = ObjectId()
+        results = await asyncio.gather(
+            manager._queue_update(alert_id, {'$set': {'status': 'completed', 'image': 'x'}}),
+            manager._queue_update(alert_id, {'$set': {'status': 'responded'}})
+        )
+        self.assertEqual(results, [True, True])
+        (operations,) = manager.alerts_collection.bulk_calls
+        self.assertEqual(len(operations), 1)
+        self.assertEqual(operations[0]._doc, {'$set': {'status': 'responded', 'image': 'x'}})
+
+    async def test_partial_bulk_write_error_fails_only_that_alert(self):
+        manager = make_manager()
+        failing, passing = ObjectId(), ObjectId()
+        manager.alerts_collection.error = BulkWriteError({
+            'nMatched': 1,
+            'writeErrors': [{'index': 0, 'code': 121, 'errmsg': 'validation failed'}]
+        })
+        results = await asyncio.gather(
+            manager._queue_update(failing, {'$set': {'status': 1}}),
+            manager._queue_update(failing, {'$set': {'response': 1}}),
+            manager._queue_update(passing, {'$set': {'status': 'responded'}}),
+            return_exceptions=True
+        )
+        self.assertIsInstance(results[0], OperationFailure)
+        self.assertIs(results[0], results[1])
+        self.assertIs(results[2], True)
+
+    async def test_unmatched_ids_resolve_false(self):
+        manager = make_manager()
+        known, unknown = ObjectId(), ObjectId()
+        manager.alerts_collection.matched_count = 1
+        manager.alerts_collection.existing = {str(known)}
+        results = await asyncio.gather(
+            manager._queue_update(known, {'$set': {'status': 'responded'}}),
+            manager._queue_update(unknown, {'$set': {'status': 'responded'}})
+        )
+        self.assertEqual(results, [True, False])
+
+    async def test_write_concern_error_fails_every_update(self):
+        manager = make_manager()
+        manager.alerts_collection.error = BulkWriteError({
+            'nMatched': 2,
+            'writeErrors': [],
+            'writeConcernErrors': [{'code': 64, 'errmsg': 'waiting for replication timed out'}]
+        })
+        results = await asyncio.gather(
+            manager._queue_update(ObjectId(), {'$set': {'status': 'responded'}}),
+            manager._queue_update(ObjectId(), {'$set': {'status': 'responded'}}),
+            return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(result, WriteConcernError) for result in results))
+
+    async def test_generic_failure_fails_every_update(self):
+        manager = make_manager()
+        manager.alerts_collection.error = RuntimeError('network down')
+        results = await asyncio.gather(
+            manager._queue_update(ObjectId(), {'$set': {'status': 'responded'}}),
+            manager._queue_update(ObjectId(), {'$set': {'status': 'responded'}}),
+            return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+
+class ResumeTokenTest(unittest.IsolatedAsyncioTestCase):
+    async def test_disconnect_saves_last_delivered_token(self):
+        manager = make_manager()
+        delivered = []
+
+        async def callback(batch):
+            delivered.extend(batch)
+
+        changes = asyncio.Queue()
+        changes.put_nowait({'_id': {'_data': '01'}, 'operationType': 'insert', 'documentKey': {'_id': 'a'}})
+        dispatcher = asyncio.create_task(manager._dispatch_changes(changes, callback))
+        while not delivered:
+            await asyncio.sleep(0.001)
+        dispatcher.cancel()
+
+        state = manager.change_stream_state_collection
+        self.assertEqual(state.update_calls, [])
+        await manager.disconnect()
+        (query, update), = state.update_calls
+        self.assertEqual(update['$set']['resume_token'], {'_data': '01'})
+
+
+class MergeUpdateTest(unittest.TestCase):
+    def test_later_event_wins_and_removals_fold_in(self):
+        target = {'updateDescription': {
+            'updatedFields': {'status': 'completed', 'image_received': 1},
+            'removedFields': ['note']
+        }}
+        DatabaseManager._merge_update(target, {'updateDescription': {
+            'updatedFields': {'status': 'responded', 'note': 'back'},
+            'removedFields': ['image_received']
+        }})
+        self.assertEqual(target['updateDescription'], {
+            'updatedFields': {'status': 'responded', 'note': 'back'},
+            'removedFields': ['image_received']
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
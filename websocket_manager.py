@@ -1,31 +1,18 @@
-import asyncio
-import json
 import logging
-from typing import Dict, Set, Optional, Any
-from fastapi import WebSocket, WebSocketDisconnect
+import orjson
+from typing import Dict, Optional, Any
+from fastapi import WebSocket
 from datetime import datetime
 import uuid
-from models import WebSocketMessage, ConnectionInfo, DroneCommand
-from database import db_manager
+from models import ConnectionInfo
+from database import db_manager, utc_now_iso
 
-def serialize_datetime(obj):
-    """Recursively serialize datetime, ObjectId, and other MongoDB objects in dictionaries"""
-    if isinstance(obj, dict):
-        return {key: serialize_datetime(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [serialize_datetime(item) for item in obj]
-    elif isinstance(obj, datetime):
-        return obj.isoformat()
-    elif hasattr(obj, '__class__') and obj.__class__.__name__ == 'ObjectId':
-        return str(obj)
-    elif hasattr(obj, '__class__') and obj.__class__.__name__ == 'Timestamp':
-        # Handle MongoDB Timestamp objects
-        return str(obj)
-    elif hasattr(obj, '__class__') and obj.__class__.__name__ == 'BSON':
-        # Handle other BSON types
-        return str(obj)
-    else:
-        return obj
+def encode_message(message: Dict[str, Any]) -> str:
+    """Encode an outgoing WebSocket message as JSON text
+    
+    orjson handles datetime natively; ObjectId and other BSON types fall back to str().
+    """
+    return orjson.dumps(message, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
 
 logger = logging.getLogger(__name__)
 
@@ -72,7 +59,7 @@ class WebSocketManager:
             "type": "connection_established",
             "client_id": client_id,
             "client_type": client_type,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": utc_now_iso()
         }
         await self.send_personal_message(client_id, welcome_message)
         
@@ -110,9 +97,7 @@ class WebSocketManager:
                 websocket = self.application_connections[client_id]
             
             if websocket:
-                # Serialize datetime objects before sending
-                serialized_message = serialize_datetime(message)
-                await websocket.send_text(json.dumps(serialized_message))
+                await websocket.send_text(encode_message(message))
             else:
                 logger.warning(f"Client {client_id} not found for personal message")
                 
@@ -127,11 +112,12 @@ class WebSocketManager:
         
         disconnected_clients = []
         
-        for client_id, websocket in self.application_connections.items():
+        # Encode once and send the same frame to every subscriber
+        encoded_message = encode_message(message)
+        
+        for client_id, websocket in list(self.application_connections.items()):
             try:
-                # Serialize datetime objects before sending
-                serialized_message = serialize_datetime(message)
-                await websocket.send_text(json.dumps(serialized_message))
+                await websocket.send_text(encoded_message)
             except Exception as e:
                 logger.error(f"Error broadcasting to application {client_id}: {e}")
                 disconnected_clients.append(client_id)
@@ -163,9 +149,8 @@ class WebSocketManager:
             # Store drone-alert mapping
             self.drone_alerts[drone_id] = alert_id
             
-            # Create a properly serialized alert for broadcasting
-            # Use the original alert data but ensure it's properly serialized
-            broadcast_alert = serialize_datetime(alert_data.copy())
+            # encode_message takes care of datetime and ObjectId values
+            broadcast_alert = alert_data.copy()
             
             # Add the alert_id to the broadcast data
             broadcast_alert['id'] = str(alert_id)
@@ -175,12 +160,13 @@ class WebSocketManager:
                 "type": "new_alert",
                 "alert": broadcast_alert,
                 "alert_id": str(alert_id),  # Convert ObjectId to string
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
             await self.broadcast_to_applications(broadcast_message)
             
             logger.info(f"Alert {alert_id} from drone {drone_id} processed and broadcasted")
-            logger.info(f"Broadcast message: {json.dumps(broadcast_message, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Broadcast message: {encode_message(broadcast_message)}")
             
         except Exception as e:
             logger.error(f"Error handling alert from drone {drone_id}: {e}")
@@ -190,13 +176,7 @@ class WebSocketManager:
         """Handle response from application (RL model output)"""
         try:
             # Update alert in database
-            update_data = {
-                'response': 1,
-                'actions': response_data.get('actions', []),
-                'status': 'responded'
-            }
-            
-            success = await db_manager.update_alert(alert_id, update_data)
+            success = await db_manager.mark_alert_responded(alert_id, response_data.get('actions', []))
             
             if success:
                 # Find the drone that sent this alert
@@ -212,7 +192,7 @@ class WebSocketManager:
                         "type": "drone_command",
                         "alert_id": alert_id,
                         "actions": response_data.get('actions', []),
-                        "timestamp": datetime.utcnow().isoformat()
+                        "timestamp": utc_now_iso()
                     }
                     await self.send_to_drone(drone_id, command_message)
                     
@@ -245,7 +225,7 @@ class WebSocketManager:
                         "type": "image_received",
                         "alert_id": alert_id,
                         "image_url": image_url,
-                        "timestamp": datetime.utcnow().isoformat()
+                        "timestamp": utc_now_iso()
                     }
                     await self.broadcast_to_applications(broadcast_message)
                     
@@ -264,9 +244,9 @@ class WebSocketManager:
             broadcast_message = {
                 "type": "alert_image_received",
                 "alert_image_id": alert_image_id,
-                "alert_image": serialize_datetime(alert_image_data),
+                "alert_image": alert_image_data,
                 "drone_id": drone_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
             await self.broadcast_to_applications(broadcast_message)
             
@@ -286,9 +266,9 @@ class WebSocketManager:
             broadcast_message = {
                 "type": "alert_image_received",
                 "alert_image_id": alert_image_id,
-                "alert_image": serialize_datetime(alert_image_data),
+                "alert_image": alert_image_data,
                 "app_id": app_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
             await self.broadcast_to_applications(broadcast_message)
             
@@ -298,9 +278,9 @@ class WebSocketManager:
                 drone_message = {
                     "type": "alert_image",
                     "alert_image_id": alert_image_id,
-                    "alert_image": serialize_datetime(alert_image_data),
+                    "alert_image": alert_image_data,
                     "app_id": app_id,
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": utc_now_iso()
                 }
                 await self.send_to_drone(drone_id, drone_message)
                 logger.info(f"Alert image {alert_image_id} forwarded to drone {drone_id}")
@@ -324,8 +304,8 @@ class WebSocketManager:
                 task_message = {
                     "type": "processing_task",
                     "task_id": task_id,
-                    "task_data": serialize_datetime(task_data),
-                    "timestamp": datetime.utcnow().isoformat()
+                    "task_data": task_data,
+                    "timestamp": utc_now_iso()
                 }
                 await self.send_to_drone(drone_id, task_message)
                 
@@ -357,10 +337,10 @@ class WebSocketManager:
                 "type": "processing_result_received",
                 "result_id": result_id,
                 "task_id": task_id,
-                "result_data": serialize_datetime(result_data),
+                "result_data": result_data,
                 "drone_id": drone_id,
                 "app_id": app_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
             await self.broadcast_to_applications(broadcast_message)
             
@@ -388,7 +368,7 @@ class WebSocketManager:
                     "status": status,
                     "drone_id": drone_id,
                     "additional_data": additional_data,
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": utc_now_iso()
                 }
                 await self.broadcast_to_applications(broadcast_message)
                 
@@ -405,7 +385,8 @@ class WebSocketManager:
             client_type = self.connection_info.get(client_id, {}).client_type
             
             logger.info(f"Handling message from {client_id} (type: {client_type}): {message_type}")
-            logger.info(f"Message data: {json.dumps(message_data, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Message data: {encode_message(message_data)}")
             
             if message_type == 'alert':
                 if client_type == 'drone':
@@ -458,7 +439,7 @@ class WebSocketManager:
                 # Respond to ping
                 pong_message = {
                     "type": "pong",
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": utc_now_iso()
                 }
                 await self.send_personal_message(client_id, pong_message)
             